@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Compares ``utkik.serializers.RowSerializer`` against a typical hand-written
+dict comprehension over model instances::
+
+    python tests/benchmark.py --rows 5000
+
+"""
+import django
+import os
+import sys
+from django.conf import settings
+from os.path import abspath, dirname, join as pjoin
+from timeit import repeat
+
+
+def benchmark(rows=2000, repeats=5):
+    here = abspath(dirname(__file__))
+    sys.path.append(pjoin(here, os.pardir))
+    sys.path.append(here)
+    settings.configure(
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            },
+        },
+        INSTALLED_APPS=['utkik_tests'],
+    )
+    django.setup()
+    from django.core.management import call_command
+    from utkik.serializers import RowSerializer
+    from utkik_tests.models import Author, News
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    author = Author.objects.create(name='Aino')
+    News.objects.bulk_create([
+        News(title='News %s' % i, body='x' * 200, author=author)
+        for i in range(rows)
+        ])
+    qs = News.objects.order_by('id')
+    serializer = RowSerializer(('id', 'title', 'author', 'author__name'))
+
+    def handwritten():
+        return [
+            {'id': n.id, 'title': n.title, 'author': n.author_id,
+             'author__name': n.author.name}
+            for n in qs.all().select_related('author')
+            ]
+
+    def compiled():
+        return serializer(qs.all())
+
+    assert handwritten() == compiled()
+    timings = {}
+    for f in handwritten, compiled:
+        timings[f.__name__] = min(repeat(f, number=1, repeat=repeats))
+        print('%-12s %.4fs' % (f.__name__, timings[f.__name__]))
+    print('speedup      %.1fx' % (timings['handwritten'] / timings['compiled']))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Benchmarks utkik row serializers.')
+    parser.add_argument('--rows', type=int, default=2000,
+        help='Number of rows to serialize.')
+    parser.add_argument('--repeat', type=int, default=5,
+        help='Number of timed runs, the best one is reported.')
+    args = parser.parse_args()
+    benchmark(rows=args.rows, repeats=args.repeat)
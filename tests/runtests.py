@@ -21,6 +21,15 @@ def runtests(test_labels=None, verbosity=1, interactive=True, failfast=True):
                 },
             },
             INSTALLED_APPS=test_labels,
+            TEMPLATES=[{
+                'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                'APP_DIRS': True,
+                'OPTIONS': {
+                    'context_processors': [
+                        'django.template.context_processors.request',
+                    ],
+                },
+            }],
         )
     django.setup()
     from django.test.utils import get_runner
@@ -1,4 +1,338 @@
 #coding=utf-8
-from django.test import TestCase
+import gzip
+import sys
+import threading
+import types
+from django.core.cache import caches
+from django.http import (HttpResponse, HttpResponseRedirect,
+    StreamingHttpResponse)
+from django.test import RequestFactory, TestCase
+from time import time
+from utkik import Fragment, JSONView, View
+from utkik.fragments import fingerprint
+from utkik.serializers import RowSerializer
+from utkik.tasks import DeferredExecutor
+from utkik.utils import cache_stats, clear_caches, import_string, uncamel
 from .models import *
 
+
+class RowSerializerTest(TestCase):
+    fields = ('id', 'title', 'author', 'author__name')
+
+    def setUp(self):
+        author = Author.objects.create(name='Aino')
+        News.objects.bulk_create([
+            News(title='News %s' % i, body='x' * 200, author=author)
+            for i in range(20)
+            ])
+
+    def handwritten(self, qs):
+        return [
+            {'id': n.id, 'title': n.title, 'author': n.author_id,
+             'author__name': n.author.name}
+            for n in qs.select_related('author')
+            ]
+
+    def test_queryset_and_instances(self):
+        serializer = RowSerializer(self.fields)
+        qs = News.objects.order_by('id')
+        expected = self.handwritten(qs)
+        self.assertEqual(serializer(qs), expected)
+        self.assertEqual(serializer(list(qs.select_related('author'))),
+            expected)
+        self.assertEqual(serializer(qs[0]), expected[0])
+
+    def test_pk(self):
+        serializer = RowSerializer(('pk', 'author__pk'))
+        qs = News.objects.order_by('id')
+        self.assertEqual(serializer(qs[0]), serializer(qs)[0])
+        self.assertEqual(serializer(list(qs)), serializer(qs))
+
+    def test_null_relation(self):
+        serializer = RowSerializer(('id', 'editor', 'editor__name'))
+        qs = News.objects.order_by('id')
+        self.assertEqual(serializer(qs[0]), serializer(qs)[0])
+        self.assertEqual(serializer(qs[0])['editor__name'], None)
+
+    def test_invalid(self):
+        serializer = RowSerializer(self.fields)
+        self.assertRaises(TypeError, serializer, [{'id': 1}])
+        self.assertRaises(TypeError, serializer, {'id': 1})
+
+
+class MemoizeTest(TestCase):
+    def test_stats_and_clear(self):
+        clear_caches()
+        self.assertEqual(uncamel('CamelCase'), 'camel_case')
+        self.assertEqual(uncamel('CamelCase'), 'camel_case')
+        info = cache_stats()['utkik.utils.uncamel']
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        clear_caches()
+        self.assertEqual(cache_stats()['utkik.utils.uncamel'].currsize, 0)
+
+    def test_failed_import_not_cached(self):
+        name = 'utkik_tests.not_yet_importable'
+        self.assertIsNone(import_string(name, silent=True))
+        self.assertRaises(ImportError, import_string, name)
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+        self.addCleanup(sys.modules.pop, name)
+        self.assertIs(import_string(name, silent=True), module)
+
+
+class FragmentView(View):
+    template_name = 'utkik_tests/fragment_page.html'
+    fragments = {
+        'news_list': Fragment('utkik_tests/news_list.html', depends=['items']),
+        }
+
+    def get(self):
+        self.c.items = ['item %s' % i for i in range(5000)]
+        self.c.user_name = self.request.GET['user']
+
+
+class FragmentTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def render(self, user):
+        request = RequestFactory().get('/', {'user': user})
+        start = time()
+        response = FragmentView().dispatch(request)
+        return time() - start, response.content.decode('utf-8')
+
+    def test_cached_fragment(self):
+        uncached, first = self.render('alice')
+        cached, second = self.render('bob')
+        self.assertIn('<p>alice</p>', first)
+        self.assertIn('<p>bob</p>', second)
+        self.assertEqual(first.split('</p>')[1], second.split('</p>')[1])
+        self.assertIn('<li>Item 4999</li>', second)
+        self.assertTrue(cached < uncached)
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint({1: 'a', 'b': [None, 2.5]}),
+            fingerprint({'b': [None, 2.5], 1: 'a'}))
+        self.assertNotEqual(fingerprint(['a']), fingerprint(['b']))
+        self.assertRaises(TypeError, fingerprint, object())
+        self.assertRaises(TypeError, fingerprint, {'a': [object()]})
+
+
+class CachedJSONView(JSONView):
+    cache_timeout = 60
+    calls = 0
+    vary = None
+    encoding = None
+    cache_control = None
+
+    def get(self):
+        CachedJSONView.calls += 1
+        self.c.items = ['item %s' % i for i in range(500)]
+        response = self.render()
+        if self.vary:
+            response['Vary'] = self.vary
+        if self.encoding:
+            response['Content-Encoding'] = self.encoding
+        if self.cache_control:
+            response['Cache-Control'] = self.cache_control
+        return response
+
+
+class CachedCsrfView(View):
+    template_name = 'utkik_tests/csrf_page.html'
+    cache_timeout = 60
+
+    def get(self):
+        pass
+
+
+class CachedResponseTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        CachedJSONView.calls = 0
+
+    def get(self, **extra):
+        request = RequestFactory().get('/items/', **extra)
+        return CachedJSONView().dispatch(request)
+
+    def test_precompressed(self):
+        identity = self.get()
+        compressed = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(CachedJSONView.calls, 1)
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['Content-Type'], 'application/json')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content),
+            identity.content)
+        refused = self.get(HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertEqual(refused.content, identity.content)
+
+    def test_vary_not_cached(self):
+        CachedJSONView.vary = 'Accept-Language'
+        self.addCleanup(setattr, CachedJSONView, 'vary', None)
+        self.get()
+        self.get()
+        self.assertEqual(CachedJSONView.calls, 2)
+
+    def test_already_encoded(self):
+        CachedJSONView.encoding = 'deflate'
+        self.addCleanup(setattr, CachedJSONView, 'encoding', None)
+        first = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        second = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(CachedJSONView.calls, 1)
+        self.assertEqual(second['Content-Encoding'], 'deflate')
+        self.assertEqual(second.content, first.content)
+
+    def test_private_not_cached(self):
+        for cache_control in 'private', 'no-store', 'max-age=60, no-cache':
+            CachedJSONView.calls = 0
+            CachedJSONView.cache_control = cache_control
+            self.addCleanup(setattr, CachedJSONView, 'cache_control', None)
+            self.get()
+            self.get()
+            self.assertEqual(CachedJSONView.calls, 2)
+
+    def test_csrf_not_cached(self):
+        first = CachedCsrfView().dispatch(RequestFactory().get('/form/'))
+        second = CachedCsrfView().dispatch(RequestFactory().get('/form/'))
+        self.assertIn(b'csrfmiddlewaretoken', first.content)
+        self.assertNotEqual(first.content, second.content)
+
+
+class GeneratorView(View):
+    content_type = 'text/csv'
+
+    def get(self):
+        yield 'id,title\n'
+        for i in range(3):
+            yield self.render_fragment('utkik_tests/row.html', item=i)
+
+
+class IteratorView(View):
+    def get(self):
+        return iter(['a', 'b'])
+
+
+class StreamingTest(TestCase):
+    def test_generator_handler(self):
+        request = RequestFactory().get('/export/')
+        response = GeneratorView().dispatch(request)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content),
+            b'id,title\n/export/:0\n/export/:1\n/export/:2\n')
+
+    def test_iterator_handler(self):
+        response = IteratorView().dispatch(RequestFactory().get('/'))
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+
+
+class DeferView(View):
+    def get(self):
+        self.defer(self.done.set)
+        return HttpResponse('ok')
+
+
+class StreamingDeferView(View):
+    def get(self):
+        yield 'a'
+        self.defer(self.done.set)
+        yield 'b'
+
+
+class DeferredTaskTest(TestCase):
+    def full_executor(self, policy):
+        executor = DeferredExecutor(max_workers=1, max_queue=0, policy=policy)
+        release = threading.Event()
+        executor.submit(release.wait, 5)
+        self.addCleanup(release.set)
+        return executor
+
+    def test_run_on_close(self):
+        view = DeferView()
+        view.done = threading.Event()
+        response = view.dispatch(RequestFactory().get('/'))
+        self.assertFalse(view.done.is_set())
+        response.close()
+        self.assertTrue(view.done.wait(5))
+
+    def test_defer_while_streaming(self):
+        view = StreamingDeferView()
+        view.done = threading.Event()
+        response = view.dispatch(RequestFactory().get('/'))
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+        response.close()
+        self.assertTrue(view.done.wait(5))
+
+    def test_drop(self):
+        executor = self.full_executor('drop')
+        ran = []
+        with self.assertLogs('utkik.tasks', 'WARNING'):
+            executor.submit(ran.append, 1)
+        self.assertEqual(ran, [])
+
+    def test_inline(self):
+        executor = self.full_executor('inline')
+        ran = []
+        executor.submit(ran.append, 1)
+        self.assertEqual(ran, [1])
+
+    def test_exception_logged(self):
+        executor = DeferredExecutor()
+        with self.assertLogs('utkik.tasks', 'ERROR'):
+            executor.run(lambda: 1 / 0)
+
+
+class HeadView(View):
+    template_name = 'utkik_tests/does_not_exist.html'
+
+    def get(self):
+        self.c.called = True
+
+    def post(self):
+        pass
+
+
+class JSONHeadView(JSONView):
+    def get(self):
+        pass
+
+
+class RedirectView(View):
+    def get(self):
+        return HttpResponseRedirect('/elsewhere/')
+
+
+class HeadOptionsTest(TestCase):
+    def test_head_skips_rendering(self):
+        view = HeadView()
+        response = view.dispatch(RequestFactory().head('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(view.c.called)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        self.assertFalse(response.has_header('Content-Length'))
+
+    def test_head_json_content_type(self):
+        response = JSONHeadView().dispatch(RequestFactory().head('/'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_head_redirect(self):
+        response = RedirectView().dispatch(RequestFactory().head('/'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], '/elsewhere/')
+
+    def test_options(self):
+        response = HeadView().dispatch(RequestFactory().options('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Allow'], 'GET, POST, HEAD, OPTIONS')
+        self.assertEqual(HeadView.get_allowed_methods()[1],
+            'GET, POST, HEAD, OPTIONS')
+        self.assertEqual(RedirectView.get_allowed_methods()[1],
+            'GET, HEAD, OPTIONS')
+
+    def test_not_allowed(self):
+        response = RedirectView().dispatch(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD, OPTIONS')
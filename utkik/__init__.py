@@ -1,2 +1,3 @@
-from utkik.base import View
+from utkik.base import JSONView, View
 from utkik.utils import HttpJSONResponse
+from utkik.fragments import Fragment
@@ -1,7 +1,16 @@
-from django.shortcuts import render_to_response
-from django.template import RequestContext
+from collections.abc import Iterator
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from hashlib import md5
+from utkik.compression import (CachedResponse, forbids_shared_cache,
+    varies_on_request)
 from utkik.decorators import http_methods
-from utkik.utils import uncamel
+from utkik.serializers import RowSerializer
+from utkik.tasks import run_on_close
+from utkik.utils import HttpJSONResponse, template_base_name
 
 
 class ContextData(object):
@@ -37,6 +46,10 @@ class View(object):
     decorators = [] # a list of decorators
     template_name = None # template name to render to
     ajax_template_name = None # template name to render to for ajax calls
+    content_type = None # content type for rendered and streamed responses
+    fragments = {} # context name to utkik.fragments.Fragment
+    cache_timeout = None # seconds to cache GET responses, None disables
+    cache_alias = 'default' # cache used for responses and their encodings
 
     def __init__(self):
         """
@@ -44,6 +57,7 @@ class View(object):
         """
         self.c = ContextData() # c is for context
         self.request = None
+        self.deferred = [] # tasks to run after the response, see defer
 
     def dispatch(self, request, *args, **kwargs):
         """
@@ -53,7 +67,14 @@ class View(object):
         and call this method when the Django handler makes a call to the view.
         """
         self.request = request
-        return self._decorate(self.get_response)(request, *args, **kwargs)
+        if self.cache_timeout is None:
+            f = self.get_response
+        else:
+            f = self.get_cached_response
+        response = self._decorate(f)(request, *args, **kwargs)
+        # Always hooked since streaming handlers may defer while the response
+        # is being consumed.
+        return run_on_close(response, self.deferred)
 
     def _decorate(self, f):
         """
@@ -62,8 +83,29 @@ class View(object):
         """
         for d in reversed(self.decorators):
             f = d(f)
-        methods = [m for m in self.methods if hasattr(self, m.lower())]
-        return http_methods(*methods)(f)
+        return http_methods(*self.get_allowed_methods()[0])(f)
+
+    @classmethod
+    def get_allowed_methods(cls):
+        """
+        Returns a tuple of the allowed methods and the corresponding
+        ``Allow`` header value, computed once per class.
+
+        A method in :attr:`methods` is allowed if the class has a lower case
+        handler for it. HEAD is allowed whenever GET is and OPTIONS is always
+        allowed, see :meth:`get_head_response` and
+        :meth:`get_options_response`.
+        """
+        allowed = cls.__dict__.get('_allowed_methods')
+        if allowed is None:
+            methods = [ m for m in cls.methods if hasattr(cls, m.lower()) ]
+            if 'GET' in methods and 'HEAD' not in methods:
+                methods.append('HEAD')
+            if 'OPTIONS' not in methods:
+                methods.append('OPTIONS')
+            allowed = methods, ', '.join(methods)
+            cls._allowed_methods = allowed
+        return allowed
 
     def get_response(self, request, *args, **kwargs):
         """
@@ -73,12 +115,104 @@ class View(object):
         First :meth:`setup` is called, mostly used for context to be accessed
         across different methods. Then we get the response from suitable
         handler method based on the HTTP method call. By default the handler is
-        already checked for existense in :meth:`_decorate`. If the handler does
-        not return a response, :meth:`render` is called and returned.
+        already checked for existense in :meth:`_decorate`. If the handler
+        returns or yields an iterator of chunks it is passed on to
+        :meth:`stream`. If the handler does not return a response,
+        :meth:`render` is called and returned.
+
+        HEAD and OPTIONS requests without a handler of their own are answered
+        by :meth:`get_head_response` and :meth:`get_options_response`.
         """
+        method = self.request.method.lower()
+        if method == 'options' and not hasattr(self, method):
+            return self.get_options_response()
         self.setup(*args, **kwargs)
-        handler = getattr(self, self.request.method.lower())
-        return handler(*args, **kwargs) or self.render()
+        if method == 'head' and not hasattr(self, method):
+            return self.get_head_response(*args, **kwargs)
+        handler = getattr(self, method)
+        response = handler(*args, **kwargs)
+        if isinstance(response, Iterator):
+            return self.stream(response)
+        return response or self.render()
+
+    def get_cached_response(self, request, *args, **kwargs):
+        """
+        Return the response for views with a :attr:`cache_timeout`.
+
+        Successful GET responses are cached per URL along with gzip, and
+        brotli if available, encoded bodies. The bodies are compressed once,
+        when the response is cached. Later GET and HEAD requests get the
+        stored body that best matches their ``Accept-Encoding`` header, and
+        neither :meth:`setup` nor the handler is called. Only use this for
+        responses that are the same for every user, see
+        :meth:`should_cache_response`.
+        """
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request, *args, **kwargs)
+        cache = caches[self.cache_alias]
+        key = 'utkik.response:%s' % md5(
+            request.build_absolute_uri().encode('utf-8')).hexdigest()
+        cached = cache.get(key)
+        if cached is None:
+            response = self.get_response(request, *args, **kwargs)
+            if not self.should_cache_response(response):
+                return response
+            cached = CachedResponse(response)
+            cache.set(key, cached, self.cache_timeout)
+        return cached.to_response(request)
+
+    def should_cache_response(self, response):
+        """
+        Returns whether :meth:`get_cached_response` may cache `response` for
+        every request to the URL. Only successful, non-streaming GET responses
+        are cached. Responses are not cached if their body may differ between
+        users: when they set cookies, vary on anything but
+        ``Accept-Encoding``, have a ``private``, ``no-store`` or ``no-cache``
+        ``Cache-Control``, or when the request touched the session or used a
+        CSRF token.
+        """
+        session = getattr(self.request, 'session', None)
+        return (self.request.method == 'GET' and
+            response.status_code == 200 and
+            not response.streaming and
+            not response.cookies and
+            not self.request.META.get('CSRF_COOKIE_USED') and
+            not (session is not None and session.accessed) and
+            not varies_on_request(response) and
+            not forbids_shared_cache(response))
+
+    def get_head_response(self, *args, **kwargs):
+        """
+        Return the response for a HEAD request to a view without a ``head``
+        handler.
+
+        The ``get`` handler is called so that it can set headers or return a
+        response of its own, such as a redirect. If it does not, nothing is
+        rendered and an empty response with the headers of :meth:`render` is
+        returned. Conditional decorators in :attr:`decorators` such as
+        ``django.views.decorators.http.condition`` still apply since they wrap
+        :meth:`get_response`.
+        """
+        response = self.get(*args, **kwargs)
+        if isinstance(response, Iterator):
+            if hasattr(response, 'close'):
+                response.close()
+            response = None
+        if response:
+            return response
+        # A streaming response so that no middleware sets a Content-Length
+        # from the empty body.
+        return StreamingHttpResponse((), content_type=self.content_type)
+
+    def get_options_response(self):
+        """
+        Return the response for an OPTIONS request to a view without an
+        ``options`` handler. The ``Allow`` header comes from
+        :meth:`get_allowed_methods`.
+        """
+        response = HttpResponse()
+        response['Allow'] = self.get_allowed_methods()[1]
+        return response
 
     def setup(self, *args, **kwargs):
         """
@@ -90,6 +224,19 @@ class View(object):
 
         """
 
+    def defer(self, func, *args, **kwargs):
+        """
+        Run ``func(*args, **kwargs)`` after the response has been handed to
+        the server, that is when it is closed. Use this for work the response
+        does not depend on::
+
+            self.defer(search_index.update, self.c.news)
+
+        Tasks run on the bounded thread pool of :mod:`utkik.tasks`, exceptions
+        are logged to the ``utkik.tasks`` logger.
+        """
+        self.deferred.append((func, args, kwargs))
+
     def get_context_data(self):
         """
         Return a dictionary containing the context data.
@@ -106,14 +253,11 @@ class View(object):
         Returns list of template names to be used for the request. Used by
         :meth:`render`.
         """
-        for dirname in reversed(self.__module__.split('.')):
-            if dirname != 'views':
-                break
-        fmt = dirname, uncamel(self.__class__.__name__)
-        template_names = [ self.template_name, u'%s/%s.html' % fmt ]
+        base = template_base_name(self.__module__, self.__class__.__name__)
+        template_names = [ self.template_name, u'%s.html' % base ]
         if self.request.is_ajax():
             template_names = [ self.ajax_template_name,
-                u'%s/%s.ajax.html' % fmt ] + template_names
+                u'%s.ajax.html' % base ] + template_names
         return [ t for t in template_names if t ]
 
     def render(self, template_name=None):
@@ -124,6 +268,108 @@ class View(object):
         By default, this is called from :meth:`get_response` if the handler does
         not return a response.
         """
-        return render_to_response(template_name or self.get_template_names(),
-            self.get_context_data(), RequestContext(self.request))
+        context = self.get_context_data()
+        if self.fragments:
+            context = dict(context, **self.get_fragments())
+        return render(self.request,
+            template_name or self.get_template_names(), context,
+            content_type=self.content_type)
+
+    def get_fragments(self):
+        """
+        Returns a dictionary of the cached fragments declared in
+        :attr:`fragments` bound to this view. These are added to the context
+        in :meth:`render` and are only rendered or fetched from cache when the
+        template outputs them::
+
+            class NewsList(View):
+                fragments = {
+                    'news_list': Fragment('news/list_fragment.html',
+                        depends=['news']),
+                    }
+
+        """
+        return dict((name, fragment.bind(name, self))
+            for name, fragment in self.fragments.items())
 
+    def render_fragment(self, template_name, **extra):
+        """
+        Renders `template_name` to a string using :meth:`get_context_data`
+        updated with `extra`. Useful for yielding chunks from a streaming
+        handler::
+
+            def get(self):
+                for news in News.objects.iterator():
+                    yield self.render_fragment('news/row.html', news=news)
+
+        """
+        context = dict(self.get_context_data(), **extra)
+        return render_to_string(template_name, context, request=self.request)
+
+    def stream(self, chunks):
+        """
+        Returns a streaming response for an iterator of string chunks.
+
+        By default, this is called from :meth:`get_response` if the handler
+        returns or yields an iterator. Chunks are consumed lazily as the server
+        writes the response, so the handler runs with constant memory.
+        """
+        return StreamingHttpResponse(chunks, content_type=self.content_type)
+
+
+
+class JSONView(View):
+    """
+    A :class:`View` that responds with ``self.c`` serialized as json, the
+    template machinery is skipped entirely.
+
+    Model instances and querysets on the context are serialized according to
+    :attr:`fields`, a mapping of context attribute names to field lists::
+
+        class NewsList(JSONView):
+            fields = {'news_list': ('id', 'title', 'author__name')}
+
+            def get(self):
+                self.c.news_list = News.objects.filter(published=True)
+
+    The field lists are compiled once per class into row serializers that
+    read querysets through ``.values_list()``.
+    """
+    fields = {} # context attribute name to a list of model fields
+    content_type = 'application/json'
+    encoder = DjangoJSONEncoder # json encoder class
+
+    @classmethod
+    def get_serializers(cls):
+        """
+        Returns a dictionary of compiled serializers for :attr:`fields`,
+        computed once per class.
+        """
+        serializers = cls.__dict__.get('_serializers')
+        if serializers is None:
+            serializers = dict(
+                (name, RowSerializer(fields))
+                for name, fields in cls.fields.items()
+                )
+            cls._serializers = serializers
+        return serializers
+
+    def get_context_data(self):
+        """
+        Returns a copy of the context data with the attributes declared in
+        :attr:`fields` serialized.
+        """
+        data = dict(self.c.__dict__)
+        for name, serializer in self.get_serializers().items():
+            value = data.get(name)
+            if value is not None:
+                data[name] = serializer(value)
+        return data
+
+    def render(self, template_name=None):
+        """
+        Returns :meth:`get_context_data` as a json response. The
+        `template_name` argument is accepted for compatibility and ignored.
+        """
+        return HttpJSONResponse(self.get_context_data(),
+            content_type=self.content_type, encoder=self.encoder)
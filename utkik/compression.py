@@ -0,0 +1,141 @@
+import gzip
+from io import BytesIO
+from django.http import HttpResponse
+from django.utils.cache import cc_delim_re, patch_vary_headers
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# preferred first
+encodings = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def gzip_compress(content):
+    """
+    Returns `content` gzip compressed with a fixed modification time so the
+    output is deterministic. ``gzip.compress`` only takes `mtime` on Python
+    3.8 and later.
+    """
+    buf = BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as f:
+        f.write(content)
+    return buf.getvalue()
+
+
+def compress_variants(content, min_length=200):
+    """
+    Returns a dictionary of encoded bodies for `content` keyed by content
+    coding, always including ``'identity'``. Brotli is only used if the
+    ``brotli`` package is installed. Encodings that do not make the body
+    smaller are left out.
+    """
+    variants = {'identity': content}
+    if len(content) < min_length:
+        return variants
+    compressed = {'gzip': gzip_compress(content)}
+    if brotli:
+        compressed['br'] = brotli.compress(content)
+    for coding, body in compressed.items():
+        if len(body) < len(content):
+            variants[coding] = body
+    return variants
+
+
+def accepted_encodings(header):
+    """
+    Returns a dictionary of content codings to quality values parsed from an
+    ``Accept-Encoding`` header.
+
+        >>> sorted(accepted_encodings('gzip, br;q=0').items())
+        [('br', 0.0), ('gzip', 1.0)]
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, available):
+    """
+    Returns the preferred content coding in `available` that is acceptable
+    according to the ``Accept-Encoding`` `header`, or ``'identity'``.
+    """
+    accepted = accepted_encodings(header)
+    for coding in encodings:
+        if coding in available and accepted.get(coding,
+                accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
+
+
+def varies_on_request(response):
+    """
+    Returns whether `response` has a ``Vary`` header naming anything but
+    ``Accept-Encoding``.
+    """
+    if not response.has_header('Vary'):
+        return False
+    return any(h.lower() != 'accept-encoding'
+        for h in cc_delim_re.split(response['Vary']) if h)
+
+
+def forbids_shared_cache(response):
+    """
+    Returns whether the ``Cache-Control`` header of `response` is
+    ``private``, ``no-store`` or ``no-cache``.
+    """
+    if not response.has_header('Cache-Control'):
+        return False
+    directives = set(d.split('=', 1)[0].strip().lower()
+        for d in cc_delim_re.split(response['Cache-Control']))
+    return bool(directives & set(['private', 'no-store', 'no-cache']))
+
+
+class CachedResponse(object):
+    """
+    A picklable snapshot of a response holding its body in every encoding from
+    :func:`compress_variants`. The bodies are compressed once, when the
+    snapshot is taken, and :meth:`to_response` then only picks one. A body
+    that already has a ``Content-Encoding`` is stored as is.
+    """
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = [ (k, v) for k, v in response.items()
+            if k.lower() != 'content-length' ]
+        if response.has_header('Content-Encoding'):
+            self.bodies = {'identity': response.content}
+        else:
+            self.bodies = compress_variants(response.content)
+
+    def to_response(self, request):
+        """
+        Returns a new response for `request` with the body in the best
+        encoding its ``Accept-Encoding`` header allows.
+        """
+        coding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.bodies)
+        content = self.bodies[coding]
+        response = HttpResponse(content, status=self.status_code)
+        for k, v in self.headers:
+            response[k] = v
+        if coding != 'identity':
+            response['Content-Encoding'] = coding
+        response['Content-Length'] = str(len(content))
+        if len(self.bodies) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -1,4 +1,4 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotAllowed
 from functools import wraps
 
 
@@ -13,12 +13,14 @@ def requires_ajax(f):
 
 
 def http_methods(*methods):
-    """Enforces one of the supplied HTTP methods"""
+    """Enforces one of the supplied HTTP methods, other methods get a 405
+    response with an ``Allow`` header listing them.
+    """
     def decorator(f):
         @wraps(f)
         def wrapper(request, *args, **kwargs):
             if not request.method in methods:
-                return HttpResponse(status=405)
+                return HttpResponseNotAllowed(methods)
             return f(request, *args, **kwargs)
         return wrapper
     decorator.__name__ = 'http_methods'
@@ -0,0 +1,125 @@
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.template.loader import render_to_string
+from datetime import date, time, timedelta
+from decimal import Decimal
+from hashlib import md5
+from uuid import UUID
+try:
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    from django.db.models.sql.datastructures import EmptyResultSet
+
+
+scalar_types = (bool, int, float, str, bytes, Decimal, date, time, timedelta,
+    UUID)
+
+
+def fingerprint(value):
+    """
+    Returns a string identifying `value` for fragment cache keys.
+
+    Querysets are identified by their SQL and model instances by their model
+    and primary key, neither is evaluated nor reloaded. Use a fragment
+    `version` to expire fragments when the underlying rows change. Other
+    values must be builtin scalars, dates, decimals, uuids or containers of
+    such values, anything else raises ``TypeError`` since its ``repr`` would
+    not identify it across requests.
+    """
+    if isinstance(value, QuerySet):
+        try:
+            return 'qs:%s' % value.query
+        except EmptyResultSet:
+            return 'qs:%s:empty' % value.model._meta.db_table
+    if isinstance(value, Model):
+        return 'obj:%s:%s' % (value._meta.db_table, value.pk)
+    if isinstance(value, dict):
+        items = sorted(
+            (repr(k), fingerprint(v)) for k, v in value.items()
+            )
+        return '{%s}' % ','.join('%s:%s' % item for item in items)
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % ','.join(fingerprint(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return 'set(%s)' % ','.join(sorted(fingerprint(v) for v in value))
+    if value is None or isinstance(value, scalar_types):
+        return repr(value)
+    raise TypeError('Cannot fingerprint %s for a fragment cache key, depend '
+        'on plain values, model instances or querysets instead.'
+        % type(value).__name__)
+
+
+class Fragment(object):
+    """
+    A template fragment whose rendered output is cached.
+
+    The fragment is rendered with only the :class:`utkik.base.ContextData`
+    attributes listed in `depends`, and the cache key is derived from a
+    fingerprint of exactly those attributes, so per-user data on the page does
+    not affect it. `version` is an optional explicit version key, or a
+    callable taking the view and returning one.
+    """
+
+    def __init__(self, template_name, depends=(), version=None,
+                 timeout=DEFAULT_TIMEOUT, cache='default'):
+        self.template_name = template_name
+        self.depends = tuple(depends)
+        self.version = version
+        self.timeout = timeout
+        self.cache = cache
+
+    def get_context(self, view):
+        return dict((name, getattr(view.c, name, None))
+            for name in self.depends)
+
+    def get_cache_key(self, name, view, context):
+        version = self.version
+        if callable(version):
+            version = version(view)
+        digest = md5(fingerprint(
+            [self.template_name] + [ context[d] for d in self.depends ]
+            ).encode('utf-8')).hexdigest()
+        return 'utkik.fragment:%s:%s:%s' % (name, version, digest)
+
+    def render(self, name, view):
+        """
+        Returns the rendered fragment from cache, rendering and caching it if
+        it is missing.
+        """
+        context = self.get_context(view)
+        key = self.get_cache_key(name, view, context)
+        cache = caches[self.cache]
+        content = cache.get(key)
+        if content is None:
+            content = render_to_string(self.template_name, context)
+            cache.set(key, content, self.timeout)
+        return content
+
+    def bind(self, name, view):
+        return BoundFragment(self, name, view)
+
+
+class BoundFragment(object):
+    """
+    A :class:`Fragment` bound to a view as it is placed on the template
+    context. Nothing is looked up nor rendered until the template outputs it.
+    """
+
+    def __init__(self, fragment, name, view):
+        self.fragment = fragment
+        self.name = name
+        self.view = view
+        self.content = None
+
+    def __call__(self):
+        if self.content is None:
+            self.content = self.fragment.render(self.name, self.view)
+        return self.content
+
+    def __str__(self):
+        return self()
+
+    def __html__(self):
+        return self()
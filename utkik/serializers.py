@@ -0,0 +1,89 @@
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from operator import attrgetter
+
+
+class RowSerializer(object):
+    """
+    Serializes model instances and querysets to dictionaries of `fields`.
+
+    Querysets are read through ``.values_list()`` so no model instances are
+    materialized. Related fields can be spanned with the usual double
+    underscore notation, ``author__name``, and end up under that key. A
+    spanned field is ``None`` when a relation on the way is null, just like
+    with ``.values_list()``.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._getters = {}
+
+    def __call__(self, obj):
+        if isinstance(obj, QuerySet):
+            return self.serialize_queryset(obj)
+        if isinstance(obj, Model):
+            return self.serialize_instance(obj)
+        if isinstance(obj, (list, tuple)):
+            return [ self.serialize_instance(o) for o in obj ]
+        raise TypeError('Cannot serialize %s, expected a queryset, a model '
+            'instance or a list of model instances.' % type(obj).__name__)
+
+    def serialize_queryset(self, qs):
+        fields = self.fields
+        return [ dict(zip(fields, row)) for row in qs.values_list(*fields) ]
+
+    def serialize_instance(self, obj):
+        if not isinstance(obj, Model):
+            raise TypeError('Cannot serialize %s, expected a model instance.'
+                % type(obj).__name__)
+        return dict(zip(self.fields, self.get_getter(obj.__class__)(obj)))
+
+    def get_getter(self, model):
+        """
+        Return and cache a getter for `model` returning a tuple of field
+        values. Foreign keys resolve to their primary key just like
+        ``.values_list()`` does.
+        """
+        getter = self._getters.get(model)
+        if getter is None:
+            paths = [ self._attnames(model, f) for f in self.fields ]
+            if all(len(names) == 1 for names in paths):
+                getter = attrgetter(*[ names[0] for names in paths ])
+                if len(paths) == 1:
+                    single = getter
+                    getter = lambda obj: (single(obj),)
+            else:
+                getters = [ path_getter(names) for names in paths ]
+                getter = lambda obj: tuple(g(obj) for g in getters)
+            self._getters[model] = getter
+        return getter
+
+    def _attnames(self, model, field):
+        names = field.split('__')
+        for i, name in enumerate(names):
+            if name == 'pk':
+                f = model._meta.pk
+            else:
+                f = model._meta.get_field(name)
+            if i == len(names) - 1:
+                names[i] = getattr(f, 'attname', name)
+            else:
+                model = f.related_model
+        return names
+
+
+def path_getter(names):
+    """
+    Returns a getter following the attribute `names` that returns ``None``
+    as soon as an attribute on the way is ``None``.
+    """
+    if len(names) == 1:
+        return attrgetter(names[0])
+
+    def getter(obj):
+        for name in names:
+            obj = getattr(obj, name)
+            if obj is None:
+                return None
+        return obj
+    return getter
@@ -0,0 +1,119 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger('utkik.tasks')
+
+
+class DeferredExecutor(object):
+    """
+    A bounded in-process thread pool for work deferred until after the
+    response has been handed to the server.
+
+    At most `max_workers` tasks run at a time and at most `max_queue` more
+    wait for a worker. When the queue is full `policy` decides what happens:
+
+    - ``'drop'``: the task is discarded and a warning is logged.
+    - ``'block'``: the caller waits for a free slot.
+    - ``'inline'``: the task runs in the calling thread.
+    """
+    policies = ('drop', 'block', 'inline')
+
+    def __init__(self, max_workers=4, max_queue=100, policy='drop'):
+        if policy not in self.policies:
+            raise ValueError('Unknown deferred task policy %r' % policy)
+        self.max_workers = max_workers
+        self.policy = policy
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.max_workers)
+        return self._pool
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue ``func(*args, **kwargs)`` to run on the pool.
+        """
+        if not self._slots.acquire(self.policy == 'block'):
+            if self.policy == 'inline':
+                self.run(func, *args, **kwargs)
+            else:
+                logger.warning('Deferred task queue is full, dropping %r',
+                    func)
+            return
+        try:
+            self.pool.submit(self._run_and_release, func, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run a task logging any exception it raises.
+        """
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Deferred task %r failed', func)
+
+    def _run_and_release(self, func, args, kwargs):
+        # Pool threads live outside the request cycle so database connections
+        # are recycled here, honouring CONN_MAX_AGE as requests do.
+        try:
+            close_old_connections()
+            self.run(func, *args, **kwargs)
+        finally:
+            close_old_connections()
+            self._slots.release()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the shared :class:`DeferredExecutor` configured from the
+    ``UTKIK_DEFERRED_WORKERS``, ``UTKIK_DEFERRED_MAX_QUEUE`` and
+    ``UTKIK_DEFERRED_POLICY`` settings.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DeferredExecutor(
+                    getattr(settings, 'UTKIK_DEFERRED_WORKERS', 4),
+                    getattr(settings, 'UTKIK_DEFERRED_MAX_QUEUE', 100),
+                    getattr(settings, 'UTKIK_DEFERRED_POLICY', 'drop'),
+                    )
+    return _executor
+
+
+def run_on_close(response, tasks):
+    """
+    Submit `tasks`, a list of ``(func, args, kwargs)`` tuples, to the shared
+    executor when `response` is closed by the server. The list is read when
+    the response is closed, so tasks added while a streaming response is
+    consumed are run as well.
+    """
+    close = response.close
+
+    def wrapper():
+        try:
+            close()
+        finally:
+            if tasks:
+                executor = get_executor()
+                for func, args, kwargs in tasks:
+                    executor.submit(func, *args, **kwargs)
+    response.close = wrapper
+    return response
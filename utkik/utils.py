@@ -1,7 +1,7 @@
 import json
 import re
 import sys
-from functools import update_wrapper
+from functools import lru_cache, update_wrapper
 from django.http import HttpResponse
 
 
@@ -10,19 +10,57 @@ uncamel_patterns = (
     re.compile('([a-z0-9])([A-Z])'),
     )
 
+_memoized = []
+
+
+def memoize(maxsize=1024):
+    """
+    A bounded LRU cache decorator for pure functions of hashable arguments.
+    The decorated functions are registered so that :func:`cache_stats` and
+    :func:`clear_caches` cover all of them.
+    """
+    def decorator(f):
+        cached = lru_cache(maxsize)(f)
+        _memoized.append(cached)
+        return cached
+    return decorator
+
+
+def cache_stats():
+    """
+    Returns a dictionary of ``functools.lru_cache`` statistics (hits, misses,
+    maxsize, currsize) for every :func:`memoize` decorated function keyed by
+    its dotted name.
+    """
+    return dict(
+        ('%s.%s' % (f.__module__, f.__name__), f.cache_info())
+        for f in _memoized
+        )
+
+
+def clear_caches():
+    """
+    Clears the caches of all :func:`memoize` decorated functions. Call this
+    from tests or when code is reloaded.
+    """
+    for f in _memoized:
+        f.cache_clear()
+
 
 class HttpJSONResponse(HttpResponse):
     """
-    A convenient response class for json serializable data.
+    A convenient response class for json serializable data. An optional
+    `encoder` is passed on to ``json.dumps`` as ``cls``.
     """
-    def __init__(self, content='', content_type=None, **kwargs):
-        content = json.dumps(content)
+    def __init__(self, content='', content_type=None, encoder=None, **kwargs):
+        content = json.dumps(content, cls=encoder)
         content_type = content_type or 'application/json'
         super(HttpJSONResponse, self).__init__(
             content=content, content_type=content_type, **kwargs
             )
 
 
+@memoize()
 def uncamel(s):
     """
     Make camelcase lowercase and use underscores.
@@ -47,6 +85,23 @@ def uncamel(s):
     return s.lower()
 
 
+@memoize()
+def template_base_name(module_name, class_name):
+    """
+    Returns the ``<< app_label >>/<< un-cameled class name >>`` base for
+    automatically computed template names of a view class.
+
+        >>> template_base_name('news.views', 'NewsList')
+        'news/news_list'
+        >>> template_base_name('news.views.archive', 'NewsList')
+        'archive/news_list'
+    """
+    for dirname in reversed(module_name.split('.')):
+        if dirname != 'views':
+            break
+    return '%s/%s' % (dirname, uncamel(class_name))
+
+
 class _Missing(object):
     def __repr__(self):
         return 'no value'
@@ -69,30 +124,38 @@ def import_string(import_name, silent=False):
     :param silent: if set to `True` import errors are ignored and
                    `None` is returned instead.
     :return: imported object
+
+    Successful imports are memoized, use :func:`clear_caches` after reloading
+    modules. Failed imports are not, they are retried on the next call.
     """
     try:
-        if ':' in import_name:
-            module, obj = import_name.split(':', 1)
-        elif '.' in import_name:
-            module, obj = import_name.rsplit('.', 1)
-        else:
-            return __import__(import_name)
-        try:
-            return getattr(__import__(module, None, None, [obj]), obj)
-        except (ImportError, AttributeError):
-            # support importing modules not yet set up by the parent module
-            # (or package for that matter)
-            modname = module + '.' + obj
-            try:
-                __import__(modname)
-            except ImportError as e:
-                raise ImportError('Failed to import %s: %s' % (modname, e))
-            return sys.modules[modname]
+        return _import_string(import_name)
     except ImportError:
         if not silent:
             raise
 
 
+@memoize()
+def _import_string(import_name):
+    if ':' in import_name:
+        module, obj = import_name.split(':', 1)
+    elif '.' in import_name:
+        module, obj = import_name.rsplit('.', 1)
+    else:
+        return __import__(import_name)
+    try:
+        return getattr(__import__(module, None, None, [obj]), obj)
+    except (ImportError, AttributeError):
+        # support importing modules not yet set up by the parent module
+        # (or package for that matter)
+        modname = module + '.' + obj
+        try:
+            __import__(modname)
+        except ImportError as e:
+            raise ImportError('Failed to import %s: %s' % (modname, e))
+        return sys.modules[modname]
+
+
 class cached_property(object):
     """A decorator that converts a function into a lazy property. The
     function wrapped is called the first time to retrieve the result